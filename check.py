@@ -7,6 +7,7 @@ Checks if all dependencies and configurations are properly set up.
 
 import sys
 import os
+import importlib.util
 
 def check_python_version():
     """Check Python version."""
@@ -23,7 +24,9 @@ def check_dependencies():
     
     for package in required_packages:
         try:
-            __import__(package)
+            # Locate the package without executing it
+            if importlib.util.find_spec(package) is None:
+                raise ImportError(package)
             print(f"✓ {package} is installed")
         except ImportError:
             print(f"❌ {package} is missing")
@@ -38,8 +41,10 @@ def check_dependencies():
 def check_config():
     """Check configuration file."""
     try:
-        # Add current directory to path
-        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        # Add script directory to path (once)
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        if script_dir not in sys.path:
+            sys.path.insert(0, script_dir)
         
         import config
         print("✓ Config file found")
@@ -67,9 +72,12 @@ def check_files():
         'domain_monitor.py', 'telegram_bot.py', 'state_manager.py'
     ]
     
+    # Snapshot the directory once instead of stat-ing each file
+    present = {entry.name for entry in os.scandir(".") if entry.is_file()}
+    
     missing = []
     for file in required_files:
-        if os.path.exists(file):
+        if file in present:
             print(f"✓ {file}")
         else:
             print(f"❌ {file} missing")
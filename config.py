@@ -4,10 +4,16 @@ Configuration Settings for Domain Tracker
 """
 
 import os
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from .env file (existing variables take precedence)
+if os.path.isfile(".env"):
+    with open(".env", encoding="utf-8") as env_file:
+        for line in env_file:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, _, value = line.partition("=")
+            os.environ.setdefault(key.strip(), value.strip().strip('"').strip("'"))
 
 # Telegram Bot Configuration
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "YOUR_BOT_TOKEN_HERE")
@@ -17,14 +23,24 @@ TELEGRAM_UNAVAILABLE_CHAT_ID = os.getenv("TELEGRAM_UNAVAILABLE_CHAT_ID", "YOUR_U
 # Monitoring Configuration
 CHECK_INTERVAL = 60  # seconds between domain checks
 STATUS_REPORT_CYCLES = 120  # send status report every N cycles
+STATE_FLUSH_CYCLES = max(1, STATUS_REPORT_CYCLES // 4)  # persist unchanged check times every N cycles
+MAX_CONCURRENT_CHECKS = 16  # RDAP/WHOIS queries in flight across all TLDs
+PER_TLD_CONCURRENCY = 2  # concurrent queries against the same TLD registry
+PER_TLD_DELAY = 0.5  # seconds between queries against the same TLD registry
 
 # Timeouts
 RDAP_TIMEOUT = 10  # seconds
 WHOIS_TIMEOUT = 20  # seconds
 TELEGRAM_TIMEOUT = 15  # seconds
+TELEGRAM_POLL_TIMEOUT = 50  # seconds Telegram may hold a getUpdates long poll open
+
+# Check Result Cache
+CACHE_TTL_UNAVAILABLE = 21600  # seconds to reuse an "unavailable" result
+CACHE_TTL_AVAILABLE = 60  # seconds to reuse an "available" result
 
 # File Paths
 STATE_FILE = "domain_state.json"
+STATE_FORMAT = "json"  # "json" or "msgpack" (needs msgspec; stored as .mpk next to STATE_FILE)
 LOGS_DIR = "logs"
 
 # Default domains to monitor (if state file doesn't exist)
@@ -4,32 +4,84 @@ Domain Monitor Module
 """
 
 import asyncio
-import asyncwhois
 import logging
-from datetime import datetime
-from typing import List
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 
 from config import (
-    RDAP_TIMEOUT, WHOIS_TIMEOUT, CHECK_INTERVAL, STATUS_REPORT_CYCLES,
-    TELEGRAM_AVAILABLE_CHAT_ID, TELEGRAM_UNAVAILABLE_CHAT_ID
+    RDAP_TIMEOUT, WHOIS_TIMEOUT, CHECK_INTERVAL, STATUS_REPORT_CYCLES, STATE_FLUSH_CYCLES,
+    TELEGRAM_AVAILABLE_CHAT_ID, TELEGRAM_UNAVAILABLE_CHAT_ID,
+    CACHE_TTL_UNAVAILABLE, CACHE_TTL_AVAILABLE, PER_TLD_CONCURRENCY, PER_TLD_DELAY,
+    MAX_CONCURRENT_CHECKS
 )
 from state_manager import state_manager
-from utils import send_telegram_message, format_datetime, get_status_emoji
 
 logger = logging.getLogger(__name__)
 
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# RDAP error messages that mean the domain is not registered
+_AVAIL_ERR_RE = re.compile(
+    r"domain not found|negative_answer_404|not found|no matching record|does not exist",
+    re.IGNORECASE
+)
+
+# Raw RDAP/WHOIS response patterns that mean the domain is not registered
+NOT_FOUND_PATTERNS = (
+    'no match', 'not found', 'no data found', 'not exist',
+    'no entries found', 'no matching record', 'available',
+    'not registered', 'no such domain', 'domain not found'
+)
+
+# Scan responses with an Aho-Corasick automaton when pyahocorasick is available
+try:
+    import ahocorasick
+    
+    _AVAIL_QS_AUTOMATON = ahocorasick.Automaton()
+    for _pattern in NOT_FOUND_PATTERNS:
+        _AVAIL_QS_AUTOMATON.add_word(_pattern, _pattern)
+    _AVAIL_QS_AUTOMATON.make_automaton()
+except ImportError:
+    _AVAIL_QS_AUTOMATON = None
+
 
 class DomainChecker:
     """Handles domain availability checking using RDAP and WHOIS."""
     
+    # domain -> (expires_at on the monotonic clock, is_available)
+    _cache: Dict[str, Tuple[float, bool]] = {}
+    
+    # asyncwhois is imported on first query to keep startup light
+    _asyncwhois = None
+    
+    @classmethod
+    def _load_asyncwhois(cls):
+        """Import asyncwhois on first use."""
+        if cls._asyncwhois is None:
+            import asyncwhois
+            cls._asyncwhois = asyncwhois
+        return cls._asyncwhois
+    
+    @classmethod
+    def prune_cache(cls) -> None:
+        """Drop expired entries from the result cache."""
+        now = time.monotonic()
+        expired = [domain for domain, (expires_at, _) in cls._cache.items() if expires_at <= now]
+        for domain in expired:
+            del cls._cache[domain]
+    
+    @classmethod
+    def invalidate(cls, domain: str) -> None:
+        """Forget the cached result for a domain so its next check queries again."""
+        cls._cache.pop(domain, None)
+    
     @staticmethod
     def _is_rdap_error_indicating_availability(error_message: str) -> bool:
         """Check if RDAP error indicates domain availability."""
-        availability_indicators = [
-            'domain not found', 'negative_answer_404', 'not found', 
-            'no matching record', 'does not exist'
-        ]
-        return any(indicator in error_message.lower() for indicator in availability_indicators)
+        return bool(_AVAIL_ERR_RE.search(error_message))
     
     @staticmethod
     def _has_registration_indicators(parsed_dict: dict) -> bool:
@@ -47,28 +99,71 @@ class DomainChecker:
     @staticmethod
     def _check_query_string_for_availability(query_string: str) -> bool:
         """Check raw query string for availability patterns."""
-        not_found_patterns = [
-            'no match', 'not found', 'no data found', 'not exist',
-            'no entries found', 'no matching record', 'available',
-            'not registered', 'no such domain', 'domain not found'
-        ]
-        
+        # One lowered copy is far cheaper than a case-insensitive regex scan
+        # over a large response; the patterns themselves are already lowercase
         query_lower = query_string.lower()
-        return any(pattern in query_lower for pattern in not_found_patterns)
+        if _AVAIL_QS_AUTOMATON is not None:
+            for _ in _AVAIL_QS_AUTOMATON.iter(query_lower):
+                return True
+            return False
+        return any(pattern in query_lower for pattern in NOT_FOUND_PATTERNS)
     
-    @staticmethod
-    async def _try_rdap_query(domain: str) -> tuple:
+    def __init__(self):
+        self._whodap_client = None
+        self._whodap_lock: Optional[asyncio.Lock] = None
+        # Query throttling, created on first use inside the event loop: one
+        # semaphore per TLD so each registry only sees a few queries at a time,
+        # plus a global cap on queries in flight
+        self._tld_semaphores: Optional[Dict[str, asyncio.Semaphore]] = None
+        self._query_semaphore: Optional[asyncio.Semaphore] = None
+        self._load_persisted_cache()
+    
+    @classmethod
+    def _load_persisted_cache(cls) -> None:
+        """Hydrate the result cache from unexpired entries in the state file."""
+        now = datetime.now()
+        for domain, entry in state_manager.get_check_cache().items():
+            try:
+                remaining = (datetime.fromisoformat(entry["expires_at"]) - now).total_seconds()
+            except (KeyError, TypeError, ValueError):
+                continue
+            if remaining > 0:
+                cls._cache[domain] = (time.monotonic() + remaining, bool(entry.get("available")))
+    
+    async def _get_whodap_client(self):
+        """
+        Return the shared RDAP client, creating it on first use.
+        Reusing one client keeps HTTP connections alive between queries and
+        fetches the IANA bootstrap data once instead of on every lookup.
+        """
+        if self._whodap_client is None:
+            if self._whodap_lock is None:
+                self._whodap_lock = asyncio.Lock()
+            async with self._whodap_lock:
+                if self._whodap_client is None:
+                    import whodap
+                    self._whodap_client = await whodap.DNSClient.new_aio_client()
+        return self._whodap_client
+    
+    async def close(self) -> None:
+        """Close the shared RDAP client."""
+        if self._whodap_client is not None:
+            await self._whodap_client.aio_close()
+            self._whodap_client = None
+    
+    async def _try_rdap_query(self, domain: str) -> tuple:
         """Try RDAP query with timeout."""
-        return await asyncio.wait_for(
-            asyncwhois.aio_rdap(domain),
-            timeout=RDAP_TIMEOUT
-        )
+        async def query() -> tuple:
+            whodap_client = await self._get_whodap_client()
+            return await self._load_asyncwhois().aio_rdap(domain, whodap_client=whodap_client)
+        
+        return await asyncio.wait_for(query(), timeout=RDAP_TIMEOUT)
     
-    @staticmethod
-    async def _try_whois_query(domain: str) -> tuple:
+    @classmethod
+    async def _try_whois_query(cls, domain: str) -> tuple:
         """Try WHOIS query with timeout."""
         return await asyncio.wait_for(
-            asyncwhois.aio_whois(domain),
+            cls._load_asyncwhois().aio_whois(domain),
             timeout=WHOIS_TIMEOUT
         )
     
@@ -76,7 +171,49 @@ class DomainChecker:
         """
         Check if a domain is available for registration using asyncwhois.
         Returns True if domain is available, False if taken.
+        Results are reused until their TTL expires.
+        """
+        is_available, _ = await self.lookup_availability(domain)
+        return is_available
+    
+    async def lookup_availability(self, domain: str) -> Tuple[bool, bool]:
+        """
+        Like check_domain_availability, but returns (is_available, from_cache)
+        so callers can tell a reused result from a fresh query.
+        """
+        hit = self._cache.get(domain)
+        if hit and hit[0] > time.monotonic():
+            return hit[1], True
+        
+        is_available = await self._throttled_query(domain)
+        if is_available is None:
+            return False, False  # Inconclusive results are not cached
+        
+        ttl = CACHE_TTL_AVAILABLE if is_available else CACHE_TTL_UNAVAILABLE
+        self._cache[domain] = (time.monotonic() + ttl, is_available)
+        # Persist with the next state save so restarts can skip the query
+        expires_at = (datetime.now() + timedelta(seconds=ttl)).isoformat()
+        state_manager.cache_check_result(domain, expires_at, is_available)
+        return is_available, False
+    
+    async def _throttled_query(self, domain: str) -> Optional[bool]:
+        """Run _query_availability under the per-TLD and global query limits."""
+        if self._tld_semaphores is None:
+            self._tld_semaphores = defaultdict(lambda: asyncio.Semaphore(PER_TLD_CONCURRENCY))
+            self._query_semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHECKS)
+        
+        async with self._tld_semaphores[domain.rsplit(".", 1)[-1]]:
+            async with self._query_semaphore:
+                result = await self._query_availability(domain)
+            await asyncio.sleep(PER_TLD_DELAY)
+        return result
+    
+    async def _query_availability(self, domain: str) -> Optional[bool]:
+        """
+        Query RDAP/WHOIS for domain availability.
+        Returns None when the lookup failed and the result is inconclusive.
         """
+        asyncwhois = self._load_asyncwhois()
         try:
             # Try RDAP first (usually faster), then fallback to WHOIS
             try:
@@ -90,7 +227,7 @@ class DomainChecker:
                     query_string, parsed_dict = await self._try_whois_query(domain)
                 except OSError as whois_error:
                     logger.warning(f"Network error for {domain}: {whois_error}")
-                    return False  # Assume unavailable on network errors
+                    return None
             
             # Check if domain is registered based on parsed data
             if parsed_dict and self._has_registration_indicators(parsed_dict):
@@ -105,53 +242,94 @@ class DomainChecker:
             
         except asyncio.TimeoutError:
             logger.warning(f"Timeout checking {domain}")
-            return False
+            return None
         except asyncwhois.NotFoundError:
             return True
         except OSError as e:
             logger.warning(f"Network error checking {domain}: {e}")
-            return False
+            return None
         except Exception as e:
             logger.error(f"Error checking {domain}: {type(e).__name__}")
-            return False
+            return None
 
 
 class DomainMonitor:
     """Main domain monitoring class."""
     
+    # Message templates, built once; only the variable parts are filled per send
+    _AVAILABLE_TEMPLATE = (
+        "🚨 <b>DOMAIN AVAILABLE!</b> 🚨\n\n"
+        "Domain: <code>{domain}</code>\n"
+        "Status: ✅ Available for registration\n"
+        "Time: {time}\n\n"
+        "Act fast! Register this domain now!"
+    )
+    _AVAILABLE_BATCH_TEMPLATE = (
+        "🚨 <b>{count} DOMAINS AVAILABLE!</b> 🚨\n\n"
+        "{domain_lines}"
+        "Status: ✅ Available for registration\n"
+        "Time: {time}\n\n"
+        "Act fast! Register these domains now!"
+    )
+    _STATUS_HEADER_TEMPLATE = (
+        "📊 <b>Domain Monitoring Status</b>\n\n"
+        "⏰ {time}\n"
+        "📋 Total domains: {total}\n"
+        "✅ Available: {available}\n"
+        "⏳ Monitoring: {unavailable}\n\n"
+    )
+    _STATUS_FOOTER = "🤖 Next status report soon..."
+    
     def __init__(self):
         self.checker = DomainChecker()
+        self.cycle_count = 0
+        self._set_cycle_time()
+    
+    def _set_cycle_time(self) -> None:
+        """Take one timestamp for the cycle, in display and ISO form."""
+        now = datetime.now()
+        self._now_str = now.strftime(TIME_FORMAT)
+        self._now_iso = now.isoformat()
     
-    async def monitor_single_domain(self, domain: str) -> None:
-        """Monitor a single domain and handle notifications."""
+    async def monitor_single_domain(self, domain: str) -> Tuple[str, bool, bool]:
+        """
+        Check a single domain and record its status.
+        Returns (domain, is_available, was_newly_available).
+        """
         try:
-            is_available = await self.checker.check_domain_availability(domain)
-            should_notify = state_manager.update_domain_status(domain, is_available)
-            
-            if should_notify and is_available:
-                await self._send_availability_notification(domain)
+            is_available, from_cache = await self.checker.lookup_availability(domain)
+            should_notify = state_manager.update_domain_status(
+                domain, is_available, now_iso=self._now_iso, from_cache=from_cache
+            )
+            return domain, is_available, should_notify and is_available
                 
         except Exception as e:
             logger.error(f"Error monitoring domain {domain}: {e}")
+            return domain, False, False
     
-    async def _send_availability_notification(self, domain: str) -> None:
-        """Send Telegram notification for newly available domain."""
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    async def _send_availability_notification(self, domains: List[str]) -> None:
+        """Send one Telegram notification for all newly available domains."""
+        from utils import send_telegram_message  # deferred: pulls in aiohttp
         
-        message = "🚨 <b>DOMAIN AVAILABLE!</b> 🚨\n\n"
-        message += f"Domain: <code>{domain}</code>\n"
-        message += "Status: ✅ Available for registration\n"
-        message += f"Time: {current_time}\n\n"
-        message += "Act fast! Register this domain now!"
+        if len(domains) == 1:
+            message = self._AVAILABLE_TEMPLATE.format(domain=domains[0], time=self._now_str)
+        else:
+            message = self._AVAILABLE_BATCH_TEMPLATE.format(
+                count=len(domains),
+                domain_lines="".join(f"Domain: <code>{domain}</code>\n" for domain in domains),
+                time=self._now_str
+            )
         
         success = await send_telegram_message(message, TELEGRAM_AVAILABLE_CHAT_ID)
-        if success:
-            logger.critical(f"ALERT: {domain} is AVAILABLE - Notification sent!")
-        else:
-            logger.error(f"Failed to send availability notification for {domain}")
+        for domain in domains:
+            if success:
+                logger.critical(f"ALERT: {domain} is AVAILABLE - Notification sent!")
+            else:
+                logger.error(f"Failed to send availability notification for {domain}")
     
     async def monitor_all_domains(self) -> None:
         """Monitor all domains concurrently (excluding already available ones)."""
+        DomainChecker.prune_cache()
         domains = state_manager.get_domains_to_check()  # Use new method
         if not domains:
             logger.info("No domains need checking (all may be available and notified)")
@@ -160,49 +338,66 @@ class DomainMonitor:
         total_domains = len(state_manager.get_domains())
         logger.info(f"Monitoring {len(domains)}/{total_domains} domains: {', '.join(domains)}")
         
-        # Monitor all domains concurrently
-        tasks = [self.monitor_single_domain(domain) for domain in domains]
-        await asyncio.gather(*tasks, return_exceptions=True)
+        # Record each result as soon as its check finishes; the checker throttles
+        # real RDAP/WHOIS queries per TLD, cached results return immediately
+        newly_available = []
+        for check in asyncio.as_completed([self.monitor_single_domain(domain) for domain in domains]):
+            domain, is_available, was_newly_available = await check
+            if was_newly_available:
+                newly_available.append(domain)
+        
+        # Write all status changes from this cycle in one save
+        state_manager.flush(now=self._now_iso)
+        
+        # Send a single notification for everything that became available this cycle
+        if newly_available:
+            await self._send_availability_notification(newly_available)
     
     async def send_status_report(self) -> None:
         """Send periodic status report."""
+        from utils import send_telegram_message  # deferred: pulls in aiohttp
+        
         try:
             stats = state_manager.get_domain_stats()
             state = state_manager.load_state()
             domains = state.get("domains", {})
             
-            available_domains = []
-            unavailable_domains = []
+            # Single pass: emit domain lines straight into per-section buffers
+            available_parts: List[str] = []
+            unavailable_parts: List[str] = []
+            unavailable_count = 0
             
             for domain, info in domains.items():
                 if info.get("status") == "available":
-                    available_domains.append((domain, info))
+                    available_parts.append(f"   • {domain}\n")
                 else:
-                    unavailable_domains.append((domain, info))
-            
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    if unavailable_count < 10:  # Limit to first 10
+                        unavailable_parts.append(f"   • {domain}\n")
+                    unavailable_count += 1
             
-            message = "📊 <b>Domain Monitoring Status</b>\n\n"
-            message += f"⏰ {current_time}\n"
-            message += f"📋 Total domains: {stats['total']}\n"
-            message += f"✅ Available: {stats['available']}\n"
-            message += f"⏳ Monitoring: {stats['unavailable']}\n\n"
+            parts: List[str] = [
+                self._STATUS_HEADER_TEMPLATE.format(
+                    time=self._now_str,
+                    total=stats['total'],
+                    available=stats['available'],
+                    unavailable=stats['unavailable']
+                )
+            ]
             
-            if available_domains:
-                message += f"✅ <b>Available ({len(available_domains)}):</b>\n"
-                for domain, info in available_domains:
-                    message += f"   • {domain}\n"
-                message += "\n"
+            if available_parts:
+                parts.append(f"✅ <b>Available ({len(available_parts)}):</b>\n")
+                parts.extend(available_parts)
+                parts.append("\n")
             
-            if unavailable_domains:
-                message += f"⏳ <b>Monitoring ({len(unavailable_domains)}):</b>\n"
-                for domain, info in unavailable_domains[:10]:  # Limit to first 10
-                    message += f"   • {domain}\n"
+            if unavailable_count:
+                parts.append(f"⏳ <b>Monitoring ({unavailable_count}):</b>\n")
+                parts.extend(unavailable_parts)
                 
-                if len(unavailable_domains) > 10:
-                    message += f"   ... and {len(unavailable_domains) - 10} more\n"
+                if unavailable_count > 10:
+                    parts.append(f"   ... and {unavailable_count - 10} more\n")
             
-            message += "🤖 Next status report soon..."
+            parts.append(self._STATUS_FOOTER)
+            message = "".join(parts)
             
             success = await send_telegram_message(message, TELEGRAM_UNAVAILABLE_CHAT_ID)
             if success:
@@ -221,10 +416,16 @@ class DomainMonitor:
             report_counter = 0
             while True:
                 report_counter += 1
+                self.cycle_count += 1
+                self._set_cycle_time()
                 
                 # Monitor all domains
                 await self.monitor_all_domains()
                 
+                # Persist unchanged check times every N checks
+                if self.cycle_count % STATE_FLUSH_CYCLES == 0:
+                    state_manager.flush(include_deferred=True, now=self._now_iso)
+                
                 # Send status report every N checks
                 if report_counter >= STATUS_REPORT_CYCLES:
                     await self.send_status_report()
@@ -238,4 +439,7 @@ class DomainMonitor:
             logger.info("Domain monitoring stopped by user")
         except Exception as e:
             logger.critical(f"Domain monitoring crashed: {e}")
-            raise
\ No newline at end of file
+            raise
+        finally:
+            state_manager.flush(include_deferred=True, durable=True)
+            await self.checker.close()
\ No newline at end of file
@@ -6,7 +6,7 @@ Domain Tracker - Main Entry Point
 import asyncio
 import logging
 
-from utils import setup_logging
+from utils import setup_logging, close_http_session
 from domain_monitor import DomainMonitor
 from telegram_bot import TelegramBot
 
@@ -54,6 +54,9 @@ class DomainTracker:
         except Exception as e:
             logger.critical(f"💥 System crashed: {e}")
             raise
+        finally:
+            await self.telegram_bot.close()
+            await close_http_session()
 
 
 def main():
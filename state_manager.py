@@ -3,38 +3,124 @@
 State Manager for Domain Tracker
 """
 
+import copy
 import json
 import os
 import logging
+from collections import Counter
 from datetime import datetime
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Tuple
 
-from config import STATE_FILE, DEFAULT_DOMAINS
+from config import STATE_FILE, STATE_FORMAT, DEFAULT_DOMAINS
 
 logger = logging.getLogger(__name__)
 
+# Use orjson for state (de)serialization when available; on-disk output is compact
+try:
+    import orjson
+
+    def _loads(data: bytes) -> Dict:
+        return orjson.loads(data)
+
+    def _dumps(state: Dict) -> bytes:
+        return orjson.dumps(state)
+except ImportError:
+    def _loads(data: bytes) -> Dict:
+        return json.loads(data.decode('utf-8'))
+
+    def _dumps(state: Dict) -> bytes:
+        return json.dumps(state, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _msgpack_codec() -> Tuple[Callable[[Dict], bytes], Callable[[bytes], Dict]]:
+    """Return (encode, decode) functions for the msgpack state format."""
+    import msgspec
+    return msgspec.msgpack.Encoder().encode, msgspec.msgpack.Decoder(dict).decode
+
 
 class StateManager:
     """Manages domain state persistence using JSON files."""
     
     def __init__(self):
-        self.state_file = STATE_FILE
+        if STATE_FORMAT == "msgpack":
+            self._encode, self._decode = _msgpack_codec()
+            self.state_file = os.path.splitext(STATE_FILE)[0] + ".mpk"
+        else:
+            self._encode, self._decode = _dumps, _loads
+            self.state_file = STATE_FILE
+        # Parsed state and the file mtime it was read at
+        self._state: Optional[Dict] = None
+        self._state_mtime = 0
+        # Unsaved changes to the cached state: _dirty ones are written by the
+        # next flush(), _deferred ones (check times, cached results) only by
+        # flush(include_deferred=True) or any other save
+        self._dirty = False
+        self._deferred = False
         self._ensure_state_file_exists()
     
     def _ensure_state_file_exists(self) -> None:
         """Create state file with default structure if it doesn't exist."""
-        if not os.path.exists(self.state_file):
-            initial_state = {
-                "domains": {},
-                "last_updated": None
-            }
-            
-            # Initialize with default domains
-            for domain in DEFAULT_DOMAINS:
-                initial_state["domains"][domain] = self._create_domain_entry()
-            
-            self.save_state(initial_state)
-            logger.info(f"Created initial state file with {len(DEFAULT_DOMAINS)} domains")
+        if self.state_file != STATE_FILE and not os.path.exists(self.state_file):
+            self._migrate_json_state()
+        
+        if os.path.exists(self.state_file):
+            return
+        
+        initial_state = {
+            "domains": {},
+            "check_cache": {},
+            "last_updated": datetime.now().isoformat()
+        }
+        
+        # Initialize with default domains
+        for domain in DEFAULT_DOMAINS:
+            initial_state["domains"][domain] = self._create_domain_entry()
+        
+        # Write a complete temp file, then hard-link it into place: the link
+        # fails if the state file already exists (no check-then-write race) and
+        # a crash mid-write can only leave the temp file behind
+        data = self._encode(initial_state)
+        tmp_file = f"{self.state_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                os.link(tmp_file, self.state_file)
+            except FileExistsError:
+                return
+            except OSError as e:
+                # No hard links on this filesystem (vfat, SMB, FUSE mounts):
+                # fall back to an exclusive create of the state file itself
+                logger.debug(f"Cannot hard-link state file ({e}), creating it directly")
+                with open(self.state_file, 'xb') as f:
+                    f.write(data)
+        except FileExistsError:
+            return
+        except Exception as e:
+            logger.error(f"Error creating state file: {e}")
+            return
+        finally:
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
+        
+        logger.info(f"Created initial state file with {len(DEFAULT_DOMAINS)} domains")
+    
+    def _migrate_json_state(self) -> None:
+        """Convert an existing JSON state file to the configured format (one-shot)."""
+        if not os.path.isfile(STATE_FILE):
+            return
+        try:
+            with open(STATE_FILE, 'rb') as f:
+                state = _loads(f.read())
+        except Exception as e:
+            logger.error(f"Error reading {STATE_FILE} for migration: {e}")
+            return
+        if self.save_state(state, durable=True):
+            logger.info(f"Migrated state from {STATE_FILE} to {self.state_file}")
     
     def _create_domain_entry(self) -> Dict:
         """Create a new domain entry with default values."""
@@ -47,29 +133,60 @@ class StateManager:
         }
     
     def load_state(self) -> Dict:
-        """Load domain state from JSON file."""
+        """
+        Load domain state from JSON file.
+        The parsed state is cached and only re-read when the file changes on disk.
+        """
         try:
-            with open(self.state_file, 'r', encoding='utf-8') as f:
-                state = json.load(f)
+            mtime = os.stat(self.state_file).st_mtime_ns
+            if self._state is not None and mtime == self._state_mtime:
+                return self._state
+            
+            with open(self.state_file, 'rb') as f:
+                state = self._decode(f.read())
                 logger.debug(f"Loaded state with {len(state.get('domains', {}))} domains")
-                return state
+            
+            self._state = state
+            self._state_mtime = mtime
+            return state
         except Exception as e:
             logger.error(f"Error loading state: {e}")
             # Return minimal state on error
             return {"domains": {}, "last_updated": None}
     
-    def save_state(self, state: Dict) -> bool:
-        """Save domain state to JSON file."""
+    def save_state(self, state: Dict, durable: bool = False, now: Optional[str] = None) -> bool:
+        """
+        Save domain state to JSON file.
+        The file is replaced atomically; pass durable=True to also fsync it
+        before the swap (for checkpoints that must survive a power loss).
+        now is an ISO timestamp for last_updated (defaults to the current time).
+        """
         try:
-            state["last_updated"] = datetime.now().isoformat()
-            with open(self.state_file, 'w', encoding='utf-8') as f:
-                json.dump(state, f, indent=2, ensure_ascii=False)
+            state["last_updated"] = now or datetime.now().isoformat()
+            
+            # Write to a temp file and swap it in so a crash can't leave a partial file
+            tmp_file = self.state_file + ".tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(self._encode(state))
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_file, self.state_file)
+            
+            self._state = state
+            self._state_mtime = os.stat(self.state_file).st_mtime_ns
+            self._dirty = False
+            self._deferred = False
             logger.debug("State saved successfully")
             return True
         except Exception as e:
             logger.error(f"Error saving state: {e}")
             return False
     
+    def dump_pretty(self) -> str:
+        """Return the current state as indented JSON, for debugging and manual inspection."""
+        return json.dumps(self.load_state(), indent=2, ensure_ascii=False)
+    
     def get_domains_to_check(self) -> List[str]:
         """
         Get list of domains that need to be checked.
@@ -93,22 +210,31 @@ class StateManager:
         state = self.load_state()
         return list(state.get("domains", {}).keys())
     
+    def _mutate(self, mutator: Callable[[Dict], bool]) -> bool:
+        """
+        Apply mutator to a copy of the cached state and save it once if it
+        reports a change. The copy only replaces the cached state once saved,
+        so a failed save leaves no change behind.
+        Returns False if the mutator made no change or the save failed.
+        """
+        state = copy.deepcopy(self.load_state())
+        if not mutator(state):
+            return False
+        return self.save_state(state)
+    
     def add_domain(self, domain: str) -> bool:
-        """Add a new domain to monitoring."""
-        try:
-            domain = domain.lower().strip()
-            state = self.load_state()
-            
+        """Add a new domain to monitoring (expects a canonical, lowercase name)."""
+        def op(state: Dict) -> bool:
             if domain in state["domains"]:
                 logger.warning(f"Domain {domain} already exists")
                 return False
-            
             state["domains"][domain] = self._create_domain_entry()
-            success = self.save_state(state)
-            
+            return True
+        
+        try:
+            success = self._mutate(op)
             if success:
                 logger.info(f"Added domain {domain} to monitoring")
-            
             return success
         except Exception as e:
             logger.error(f"Error adding domain {domain}: {e}")
@@ -117,11 +243,9 @@ class StateManager:
     def reset_domain_for_monitoring(self, domain: str) -> bool:
         """
         Reset a domain to be monitored again (useful for available domains).
+        Expects a canonical, lowercase name.
         """
-        try:
-            domain = domain.lower().strip()
-            state = self.load_state()
-            
+        def op(state: Dict) -> bool:
             if domain not in state["domains"]:
                 logger.warning(f"Domain {domain} not found")
                 return False
@@ -132,43 +256,51 @@ class StateManager:
             domain_info["notification_sent"] = False
             domain_info["last_status_change"] = datetime.now().isoformat()
             
-            success = self.save_state(state)
-            
+            # Drop the persisted check result; callers also clear the checker's
+            # in-memory cache so the next cycle queries it again
+            state.get("check_cache", {}).pop(domain, None)
+            return True
+        
+        try:
+            success = self._mutate(op)
             if success:
                 logger.info(f"Reset domain {domain} for monitoring")
-            
             return success
         except Exception as e:
             logger.error(f"Error resetting domain {domain}: {e}")
             return False
     
     def remove_domain(self, domain: str) -> bool:
-        """Remove a domain from monitoring."""
-        try:
-            domain = domain.lower().strip()
-            state = self.load_state()
-            
+        """Remove a domain from monitoring (expects a canonical, lowercase name)."""
+        def op(state: Dict) -> bool:
             if domain not in state["domains"]:
                 logger.warning(f"Domain {domain} not found")
                 return False
-            
             del state["domains"][domain]
-            success = self.save_state(state)
-            
+            state.get("check_cache", {}).pop(domain, None)
+            return True
+        
+        try:
+            success = self._mutate(op)
             if success:
                 logger.info(f"Removed domain {domain} from monitoring")
-            
             return success
         except Exception as e:
             logger.error(f"Error removing domain {domain}: {e}")
             return False
     
-    def update_domain_status(self, domain: str, is_available: bool) -> bool:
+    def update_domain_status(
+        self, domain: str, is_available: bool, now_iso: Optional[str] = None,
+        from_cache: bool = False
+    ) -> bool:
         """
         Update domain status and return True if notification should be sent.
+        Changes are kept in memory until the next flush().
+        now_iso lets a check cycle stamp all its domains with one timestamp.
+        from_cache marks a reused result: last_checked is left at the last real query.
         """
         try:
-            current_time = datetime.now().isoformat()
+            current_time = now_iso or datetime.now().isoformat()
             state = self.load_state()
             
             # Ensure domain exists
@@ -180,7 +312,8 @@ class StateManager:
             new_status = "available" if is_available else "unavailable"
             
             # Update basic info
-            domain_info["last_checked"] = current_time
+            if not from_cache:
+                domain_info["last_checked"] = current_time
             domain_info["status"] = new_status
             
             # Special case: First time checking (unknown -> available/unavailable)
@@ -190,7 +323,7 @@ class StateManager:
                     domain_info["first_available_date"] = current_time
                 domain_info["last_status_change"] = current_time
                 domain_info["notification_sent"] = False
-                self.save_state(state)
+                self._dirty = True
                 return False  # No notification for initial state
             
             # Check if status changed from known state
@@ -201,51 +334,71 @@ class StateManager:
                     # Domain became available from unavailable
                     domain_info["first_available_date"] = current_time
                     domain_info["notification_sent"] = False
-                    self.save_state(state)
+                    self._dirty = True
                     return True  # Send notification for real status change
                 else:
                     # Domain became unavailable
                     domain_info["notification_sent"] = False
-                    self.save_state(state)
+                    self._dirty = True
                     return False
             else:
                 # Status didn't change and we've seen this domain before
                 if is_available and not domain_info["notification_sent"]:
                     # Domain is still available but we haven't sent notification yet
                     domain_info["notification_sent"] = True
-                    self.save_state(state)
+                    self._dirty = True
                     return True
                 
-                self.save_state(state)
+                # Nothing changed but the check time; defer the write
+                if not from_cache:
+                    self._deferred = True
                 return False
                 
         except Exception as e:
             logger.error(f"Error updating domain status for {domain}: {e}")
             return False
     
+    def get_check_cache(self) -> Dict:
+        """Get persisted check results (domain -> {"expires_at", "available"})."""
+        return self.load_state().get("check_cache", {})
+    
+    def cache_check_result(self, domain: str, expires_at: str, is_available: bool) -> None:
+        """Record a check result to persist with a later state save."""
+        state = self.load_state()
+        state.setdefault("check_cache", {})[domain] = {
+            "expires_at": expires_at,
+            "available": is_available
+        }
+        self._deferred = True
+    
+    def flush(
+        self, include_deferred: bool = False, durable: bool = False, now: Optional[str] = None
+    ) -> bool:
+        """
+        Write unsaved changes to the state file in a single save.
+        Deferred changes (check times, cached results) are only written
+        when include_deferred is True.
+        """
+        if self._state is None or not (self._dirty or (include_deferred and self._deferred)):
+            return True
+        return self.save_state(self._state, durable=durable, now=now)
+    
     def get_domain_stats(self) -> Dict:
         """Get statistics about monitored domains."""
         state = self.load_state()
         domains = state.get("domains", {})
         
-        stats = {
+        counts = Counter(domain_info.get("status", "unknown") for domain_info in domains.values())
+        available = counts["available"]
+        unavailable = counts["unavailable"]
+        
+        return {
             "total": len(domains),
-            "available": 0,
-            "unavailable": 0,
-            "unknown": 0,
+            "available": available,
+            "unavailable": unavailable,
+            "unknown": len(domains) - available - unavailable,  # any other status
             "last_updated": state.get("last_updated", "Never")
         }
-        
-        for domain_info in domains.values():
-            status = domain_info.get("status", "unknown")
-            if status == "available":
-                stats["available"] += 1
-            elif status == "unavailable":
-                stats["unavailable"] += 1
-            else:
-                stats["unknown"] += 1
-        
-        return stats
 
 
 # Global instance
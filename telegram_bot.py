@@ -6,14 +6,19 @@ Telegram Bot Module
 import asyncio
 import aiohttp
 import logging
+import os
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from config import (
-    TELEGRAM_BOT_TOKEN, TELEGRAM_AVAILABLE_CHAT_ID, TELEGRAM_UNAVAILABLE_CHAT_ID
+    TELEGRAM_BOT_TOKEN, TELEGRAM_AVAILABLE_CHAT_ID, TELEGRAM_UNAVAILABLE_CHAT_ID,
+    TELEGRAM_TIMEOUT, TELEGRAM_POLL_TIMEOUT
 )
+from domain_monitor import DomainChecker
 from state_manager import state_manager
-from utils import send_telegram_message, format_datetime_short, get_status_emoji, validate_domain
+from utils import (
+    send_telegram_message, get_status_emoji, canonicalize_domain, new_http_session, read_last_lines
+)
 
 logger = logging.getLogger(__name__)
 
@@ -23,44 +28,80 @@ class TelegramBot:
     
     def __init__(self):
         self.bot_token = TELEGRAM_BOT_TOKEN
-        self.authorized_chat_ids = [TELEGRAM_AVAILABLE_CHAT_ID, TELEGRAM_UNAVAILABLE_CHAT_ID]
+        self.authorized_chat_ids = frozenset(
+            str(cid) for cid in (TELEGRAM_AVAILABLE_CHAT_ID, TELEGRAM_UNAVAILABLE_CHAT_ID)
+            if cid is not None
+        )
         self.offset = 0
+        self.session: Optional[aiohttp.ClientSession] = None
+        
+        # Command dispatch tables: commands taking a domain argument, and the rest
+        self._domain_handlers = {
+            "/add": self.handle_add_command,
+            "/remove": self.handle_remove_command,
+            "/reset": self.handle_reset_command,
+        }
+        self._handlers = {
+            "/list": self.handle_list_command,
+            "/status": self.handle_status_command,
+            "/logs": self.handle_logs_command,
+            "/help": self.handle_help_command,
+        }
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the bot's HTTP session, creating it on first use."""
+        if self.session is None or self.session.closed:
+            self.session = new_http_session()
+        return self.session
     
-    async def get_updates(self) -> List[Dict]:
-        """Get new messages from Telegram."""
+    async def close(self) -> None:
+        """Close the bot's HTTP session."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+    
+    async def get_updates(self) -> Optional[List[Dict]]:
+        """
+        Get new messages from Telegram.
+        Long-polls: Telegram holds the request open until an update arrives or
+        TELEGRAM_POLL_TIMEOUT passes. Returns None if the request failed.
+        """
         try:
             url = f"https://api.telegram.org/bot{self.bot_token}/getUpdates"
             params = {
                 "offset": self.offset,
-                "timeout": 30,
+                "timeout": TELEGRAM_POLL_TIMEOUT,
                 "allowed_updates": ["message"]
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, timeout=35) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data.get("result", [])
-                    else:
-                        logger.error(f"Failed to get updates: {response.status}")
-                        return []
+            session = self._get_session()
+            timeout = aiohttp.ClientTimeout(
+                total=None, sock_connect=TELEGRAM_TIMEOUT, sock_read=TELEGRAM_POLL_TIMEOUT + 5
+            )
+            async with session.get(url, params=params, timeout=timeout) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return data.get("result", [])
+                else:
+                    logger.error(f"Failed to get updates: {response.status}")
+                    return None
                         
         except Exception as e:
             logger.error(f"Error getting updates: {e}")
-            return []
+            return None
     
     def is_authorized(self, chat_id: str) -> bool:
         """Check if chat is authorized to use bot commands."""
-        return str(chat_id) in [str(cid) for cid in self.authorized_chat_ids]
+        return str(chat_id) in self.authorized_chat_ids
     
-    def handle_add_command(self, domain: str) -> str:
+    async def handle_add_command(self, domain: str) -> str:
         """Add domain to monitoring list."""
         try:
-            # Validate domain format
-            if not validate_domain(domain):
+            # Validate and normalize domain
+            canonical = canonicalize_domain(domain)
+            if canonical is None:
                 return "❌ Invalid domain format. Please provide a valid domain (e.g., example.com)"
-            
-            domain = domain.lower().strip()
+            domain = canonical
             
             # Add domain using state manager
             success = state_manager.add_domain(domain)
@@ -75,14 +116,14 @@ class TelegramBot:
             logger.error(f"Error adding domain {domain}: {e}")
             return f"❌ Error adding domain: {str(e)}"
     
-    def handle_reset_command(self, domain: str) -> str:
+    async def handle_reset_command(self, domain: str) -> str:
         """Reset domain to be monitored again."""
         try:
-            # Validate domain format
-            if not validate_domain(domain):
+            # Validate and normalize domain
+            canonical = canonicalize_domain(domain)
+            if canonical is None:
                 return "❌ Invalid domain format. Please provide a valid domain (e.g., example.com)"
-            
-            domain = domain.lower().strip()
+            domain = canonical
             
             # Check if domain exists
             domains = state_manager.get_domains()
@@ -93,6 +134,7 @@ class TelegramBot:
             success = state_manager.reset_domain_for_monitoring(domain)
             
             if success:
+                DomainChecker.invalidate(domain)
                 return f"✅ Domain {domain} has been reset and will be monitored again."
             else:
                 return f"❌ Failed to reset domain {domain}. Please try again."
@@ -101,15 +143,17 @@ class TelegramBot:
             logger.error(f"Error in reset command for domain {domain}: {e}")
             return f"❌ Error resetting domain {domain}. Please try again."
     
-    def handle_remove_command(self, domain: str) -> str:
+    async def handle_remove_command(self, domain: str) -> str:
         """Remove domain from monitoring list."""
         try:
-            domain = domain.lower().strip()
+            # Normalize only: entries that fail validation can still be removed
+            domain = domain.strip().lower()
             
             # Remove domain using state manager
             success = state_manager.remove_domain(domain)
             
             if success:
+                DomainChecker.invalidate(domain)
                 logger.info(f"Removed domain {domain} via Telegram command")
                 return f"✅ Domain <code>{domain}</code> removed from monitoring list successfully!"
             else:
@@ -119,7 +163,7 @@ class TelegramBot:
             logger.error(f"Error removing domain {domain}: {e}")
             return f"❌ Error removing domain: {str(e)}"
     
-    def handle_list_command(self) -> str:
+    async def handle_list_command(self) -> str:
         """List all monitored domains."""
         try:
             state = state_manager.load_state()
@@ -128,21 +172,21 @@ class TelegramBot:
             if not domains:
                 return "📋 No domains are currently being monitored."
             
-            message = f"📋 <b>Monitored Domains ({len(domains)}):</b>\n\n"
+            lines = [f"📋 <b>Monitored Domains ({len(domains)}):</b>", ""]
             
             for domain, info in domains.items():
                 status = info.get("status", "unknown")
                 status_emoji = get_status_emoji(status)
                 
-                message += f"{status_emoji} <code>{domain}</code> ({status})\n"
+                lines.append(f"{status_emoji} <code>{domain}</code> ({status})")
             
-            return message
+            return "\n".join(lines)
             
         except Exception as e:
             logger.error(f"Error listing domains: {e}")
             return f"❌ Error retrieving domain list: {str(e)}"
     
-    def handle_status_command(self) -> str:
+    async def handle_status_command(self) -> str:
         """Show current monitoring status."""
         try:
             stats = state_manager.get_domain_stats()
@@ -159,12 +203,9 @@ class TelegramBot:
             logger.error(f"Error getting status: {e}")
             return f"❌ Error retrieving status: {str(e)}"
     
-    def handle_logs_command(self) -> str:
+    async def handle_logs_command(self) -> str:
         """Show last 10 log entries."""
         try:
-            from datetime import datetime
-            import os
-            
             # Get today's log file
             today = datetime.now().strftime("%Y-%m-%d")
             log_file = f"logs/domain_tracker_{today}.log"
@@ -172,17 +213,15 @@ class TelegramBot:
             if not os.path.exists(log_file):
                 return "� No log file found for today"
             
-            # Read last 10 lines
-            with open(log_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
-            # Get last 10 lines (or all if less than 10)
-            last_lines = lines[-10:] if len(lines) >= 10 else lines
+            # Read last 10 lines (or all if less than 10) from the end of the file,
+            # in a worker thread so the disk read doesn't stall the event loop
+            loop = asyncio.get_running_loop()
+            last_lines = await loop.run_in_executor(None, read_last_lines, log_file, 10)
             
             if not last_lines:
                 return "📝 Log file is empty"
             
-            message = "� <b>Last 10 Log Entries:</b>\n\n"
+            lines = ["� <b>Last 10 Log Entries:</b>", ""]
             for line in last_lines:
                 line = line.strip()
                 if line:
@@ -196,21 +235,21 @@ class TelegramBot:
                             # Show only time (HH:MM:SS)
                             if ',' in timestamp:
                                 time_part = timestamp.split(',')[0].split(' ')[-1]
-                                message += f"<code>{time_part}</code> {level}: {msg}\n"
+                                lines.append(f"<code>{time_part}</code> {level}: {msg}")
                             else:
-                                message += f"<code>{line}</code>\n"
+                                lines.append(f"<code>{line}</code>")
                         else:
-                            message += f"<code>{line}</code>\n"
+                            lines.append(f"<code>{line}</code>")
                     else:
-                        message += f"<code>{line}</code>\n"
+                        lines.append(f"<code>{line}</code>")
             
-            return message
+            return "\n".join(lines)
             
         except Exception as e:
             logger.error(f"Error reading logs: {e}")
             return f"❌ Error reading log file: {e}"
     
-    def handle_help_command(self) -> str:
+    async def handle_help_command(self) -> str:
         """Show available commands."""
         return """🤖 <b>Domain Tracker Bot Commands</b>
 
@@ -248,44 +287,19 @@ class TelegramBot:
                 return
             
             parts = text.split()
-            command = parts[0].lower()
-            
-            # Remove bot username from command if present (e.g., /logs@botname -> /logs)
-            if "@" in command:
-                command = command.split("@")[0]
-            
-            response = ""
+            # Drop bot username if present (e.g., /logs@botname -> /logs)
+            command = parts[0].partition("@")[0].lower()
             
-            if command == "/add" and len(parts) >= 2:
-                domain = parts[1]
-                response = self.handle_add_command(domain)
-                
-            elif command == "/remove" and len(parts) >= 2:
-                domain = parts[1]
-                response = self.handle_remove_command(domain)
-                
-            elif command == "/reset" and len(parts) >= 2:
-                domain = parts[1]
-                response = self.handle_reset_command(domain)
-                
-            elif command == "/list":
-                response = self.handle_list_command()
-                
-            elif command == "/status":
-                response = self.handle_status_command()
-                
-            elif command == "/logs":
-                response = self.handle_logs_command()
-                
-            elif command == "/help":
-                response = self.handle_help_command()
-                
+            if command in self._domain_handlers and len(parts) >= 2:
+                response = await self._domain_handlers[command](parts[1])
+            elif command in self._handlers:
+                response = await self._handlers[command]()
             else:
                 response = "❓ Unknown command. Use /help to see available commands."
             
             # Send response
             if response:
-                await send_telegram_message(response, str(chat_id))
+                await send_telegram_message(response, str(chat_id), session=self._get_session())
                 
         except Exception as e:
             logger.error(f"Error processing message: {e}")
@@ -300,9 +314,10 @@ class TelegramBot:
         while True:
             try:
                 updates = await self.get_updates()
+                if updates is None:
+                    raise ConnectionError("getUpdates request failed")
                 
-                if updates:
-                    consecutive_errors = 0  # Reset error counter on success
+                consecutive_errors = 0  # Reset error counter on success
                 
                 for update in updates:
                     # Update offset
@@ -312,8 +327,7 @@ class TelegramBot:
                     if "message" in update:
                         await self.process_message(update["message"])
                 
-                # Small delay to prevent API spam
-                await asyncio.sleep(1)
+                # No delay needed: the next long poll blocks server-side
                 
             except KeyboardInterrupt:
                 logger.info("Telegram bot stopped by user")
@@ -5,14 +5,22 @@ Utility Functions for Domain Tracker
 
 import logging
 import os
+import re
 import aiohttp
 from datetime import datetime
-from typing import Optional
+from functools import lru_cache
+from typing import List, Optional
 
-from config import TELEGRAM_BOT_TOKEN, LOGS_DIR, LOG_LEVEL, LOG_FORMAT
+from config import TELEGRAM_BOT_TOKEN, TELEGRAM_TIMEOUT, LOGS_DIR, LOG_LEVEL, LOG_FORMAT
 
 logger = logging.getLogger(__name__)
 
+# RFC 1035 style hostname: dot-separated labels of up to 63 letters, digits or
+# inner hyphens, at least two labels, 253 chars total. Letters include Unicode
+# so internationalized domains are accepted as typed.
+_DOMAIN_LABEL = r"[^\W_](?:(?:[^\W_]|-){0,61}[^\W_])?"
+_DOMAIN_RE = re.compile(rf"(?=.{{1,253}}$){_DOMAIN_LABEL}(?:\.{_DOMAIN_LABEL})+")
+
 
 def setup_logging() -> None:
     """Configure logging with daily rotation."""
@@ -35,13 +43,19 @@ def setup_logging() -> None:
     logger.info(f"Logging configured - File: {log_filename}")
 
 
+@lru_cache(maxsize=1024)
+def _format_iso(iso_string: str, pattern: str) -> str:
+    """Parse an ISO datetime string and format it (cached; timestamps recur)."""
+    dt = datetime.fromisoformat(iso_string.replace('Z', '+00:00'))
+    return dt.strftime(pattern)
+
+
 def format_datetime(iso_string: str, fallback: str = "Unknown") -> str:
     """Format ISO datetime string to readable format."""
     if not iso_string or iso_string == fallback:
         return fallback
     try:
-        dt = datetime.fromisoformat(iso_string.replace('Z', '+00:00'))
-        return dt.strftime("%Y-%m-%d %H:%M")
+        return _format_iso(iso_string, "%Y-%m-%d %H:%M")
     except (ValueError, TypeError):
         return fallback
 
@@ -51,33 +65,81 @@ def format_datetime_short(iso_string: str, fallback: str = "Unknown") -> str:
     if not iso_string or iso_string == fallback:
         return fallback
     try:
-        dt = datetime.fromisoformat(iso_string.replace('Z', '+00:00'))
-        return dt.strftime("%m-%d %H:%M")
+        return _format_iso(iso_string, "%m-%d %H:%M")
     except (ValueError, TypeError):
         return fallback
 
 
-def validate_domain(domain: str) -> bool:
-    """Basic domain format validation."""
+def read_last_lines(path: str, count: int, chunk_size: int = 8192) -> List[str]:
+    """
+    Read the last `count` lines of a text file without loading all of it.
+    Reads a chunk from the end and doubles it until enough lines are found.
+    """
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        while True:
+            start = max(0, size - chunk_size)
+            f.seek(start)
+            lines = f.read(size - start).decode('utf-8', 'replace').splitlines()
+            if start > 0:
+                lines = lines[1:]  # first line may be cut off
+            if len(lines) >= count or start == 0:
+                return lines[-count:]
+            chunk_size *= 2
+
+
+def canonicalize_domain(domain: str) -> Optional[str]:
+    """
+    Normalize a user-supplied domain (strip + lowercase).
+    Returns the canonical form, or None if it is not a valid domain.
+    """
     if not domain or not isinstance(domain, str):
-        return False
+        return None
     
     domain = domain.strip().lower()
-    
-    # Basic checks
-    if not domain or '.' not in domain:
-        return False
-    
-    # Check for invalid characters
-    if any(char in domain for char in [' ', '/', '\\', '?', '#']):
-        return False
-    
-    return True
+    # Single regex pass; also rejects whitespace, '/', '\\', '?' and '#'
+    return domain if _DOMAIN_RE.fullmatch(domain) else None
+
+
+def validate_domain(domain: str) -> bool:
+    """Basic domain format validation."""
+    return canonicalize_domain(domain) is not None
+
+
+# Shared session for Telegram requests, created on first use
+_http_session: Optional[aiohttp.ClientSession] = None
+
+
+def new_http_session() -> aiohttp.ClientSession:
+    """Create a keep-alive HTTP session for the Telegram API (call inside the event loop)."""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=10, keepalive_timeout=60),
+        timeout=aiohttp.ClientTimeout(total=TELEGRAM_TIMEOUT)
+    )
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Get the shared HTTP session, creating it on first use."""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = new_http_session()
+    return _http_session
 
 
-async def send_telegram_message(message: str, chat_id: str) -> bool:
+async def close_http_session() -> None:
+    """Close the shared HTTP session."""
+    global _http_session
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
+
+
+async def send_telegram_message(
+    message: str, chat_id: str, session: Optional[aiohttp.ClientSession] = None
+) -> bool:
     """
     Send a message to Telegram using the bot API.
+    Uses the given session, or the shared one if none is passed.
     Returns True if successful, False otherwise.
     """
     try:
@@ -88,25 +150,26 @@ async def send_telegram_message(message: str, chat_id: str) -> bool:
             "parse_mode": "HTML"
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=data, timeout=30) as response:
-                if response.status == 200:
-                    logger.debug(f"Telegram message sent to {chat_id}")
-                    return True
-                else:
-                    logger.error(f"Failed to send Telegram message: {response.status}")
-                    return False
+        session = session or get_http_session()
+        async with session.post(url, json=data) as response:
+            if response.status == 200:
+                logger.debug(f"Telegram message sent to {chat_id}")
+                return True
+            else:
+                logger.error(f"Failed to send Telegram message: {response.status}")
+                return False
                     
     except Exception as e:
         logger.error(f"Error sending Telegram message: {e}")
         return False
 
 
+_STATUS_EMOJI = {
+    "available": "✅",
+    "unavailable": "⏳",
+}
+
+
 def get_status_emoji(status: str) -> str:
     """Get emoji for domain status."""
-    if status == "available":
-        return "✅"
-    elif status == "unavailable":
-        return "⏳"
-    else:
-        return "❓"
\ No newline at end of file
+    return _STATUS_EMOJI.get(status, "❓")
\ No newline at end of file